@@ -1,14 +1,16 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 import os
 import uuid
 import sys
 from learningGaps import analyze_and_export
+import attempt_store
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "llm")))
 import query
 
 import pandas as pd
 import re
+import json
 from io import BytesIO
 
 app = Flask(__name__)
@@ -39,6 +41,9 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
 ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
 
+# Every uploaded attempt row is kept here for the history endpoints
+attempt_store.init_db()
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -67,18 +72,33 @@ def upload_file():
         
         print(f"Processing file: {filename}")
         
-        # Analyze the uploaded file
-        analysis_result = analyze_and_export(file_path)
-        
-        # Clean up the uploaded file
+        # Parse the workbook once; it is both analyzed and stored
         try:
-            os.remove(file_path)
-        except:
-            pass  # Ignore cleanup errors
+            df = pd.read_excel(file_path)
+        finally:
+            # Clean up the uploaded file
+            try:
+                os.remove(file_path)
+            except:
+                pass  # Ignore cleanup errors
+        
+        analysis_result = analyze_and_export(df)
         
         if analysis_result['success']:
             print("Analysis completed successfully")
-            return jsonify(analysis_result['data'])
+            data = analysis_result['data']
+
+            # Persist the attempt rows. Duplicates are detected from row content; the activity is
+            # only a display label (the optional form field, else the workbook name)
+            activity = request.form.get('activity', '').strip() or os.path.splitext(file.filename)[0]
+            try:
+                data['history_import'] = attempt_store.import_dataframe(df, activity, source_file=file.filename)
+                print(f"Stored attempts: {data['history_import']}")
+            except Exception as store_error:
+                print(f"Could not store attempts: {str(store_error)}")
+                data['history_import'] = {'error': str(store_error)}
+
+            return jsonify(data)
         else:
             print(f"Analysis failed: {analysis_result['error']}")
             return jsonify({'error': analysis_result['error']}), 500
@@ -136,6 +156,61 @@ def query_api():
         print(error_msg)
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route("/query/batch", methods=["POST"])
+def query_batch_api():
+    """
+    Generates study materials for a list of queries. Results are streamed as
+    newline-delimited JSON, one line per query as soon as it completes,
+    followed by a summary line.
+    """
+    try:
+        if not request.is_json:
+            return jsonify({"error": "Request must be JSON"}), 400
+
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        queries = data.get("queries")
+        if not isinstance(queries, list) or not queries:
+            return jsonify({"error": "'queries' must be a non-empty list"}), 400
+        if not all(isinstance(q, str) for q in queries):
+            return jsonify({"error": "Every query must be a string"}), 400
+        if len(queries) > query.MAX_BATCH_QUERIES:
+            return jsonify({"error": f"At most {query.MAX_BATCH_QUERIES} queries are allowed per batch"}), 400
+
+        max_concurrency = data.get("max_concurrency", query.BATCH_LLM_CONCURRENCY)
+        if isinstance(max_concurrency, bool) or not isinstance(max_concurrency, int) or max_concurrency < 1:
+            return jsonify({"error": "'max_concurrency' must be a positive integer"}), 400
+        max_concurrency = min(max_concurrency, query.BATCH_LLM_CONCURRENCY)
+
+        print(f"Received batch of {len(queries)} queries")
+
+        try:
+            results = query.run_batch_query(queries, max_concurrency=max_concurrency)
+        except Exception as query_error:
+            print(f"Error in batch query processing: {str(query_error)}")
+            return jsonify({
+                "error": f"Failed to process queries: {str(query_error)}"
+            }), 500
+
+        def stream():
+            for result in results:
+                yield json.dumps(result) + "\n"
+
+        return Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+
+    except Exception as e:
+        import traceback
+        error_msg = f'Server error: {str(e)}\nTraceback: {traceback.format_exc()}'
+        print(error_msg)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route("/query/stats")
+def query_stats():
+    """LLM scheduler queue depth, wait times and coalesced request counts."""
+    return jsonify(query.get_llm_stats())
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_performance_data():
     """
@@ -207,6 +282,32 @@ def download_performance_report(session_id):
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
+@app.route('/api/history/students/<login_id>', methods=['GET'])
+def student_history_api(login_id):
+    """Stored attempts of one student. Optional filters: ?question_id=...&activity=..."""
+    try:
+        history = attempt_store.student_history(
+            login_id,
+            question_id=request.args.get('question_id'),
+            activity=request.args.get('activity')
+        )
+        if not history['attempts']:
+            return jsonify({"error": f"No stored attempts for student '{login_id}'"}), 404
+        return jsonify(history)
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+@app.route('/api/history/questions/<question_id>', methods=['GET'])
+def question_history_api(question_id):
+    """Cohort accuracy for one question per activity and attempt. Optional filter: ?activity=..."""
+    try:
+        history = attempt_store.question_history(question_id, activity=request.args.get('activity'))
+        if not history['timeline']:
+            return jsonify({"error": f"No stored attempts for question '{question_id}'"}), 404
+        return jsonify(history)
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
 @app.route("/health")
 def health():
     return jsonify({"status": "healthy"})
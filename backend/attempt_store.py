@@ -0,0 +1,230 @@
+import os
+import json
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Path of the SQLite file that keeps every imported attempt row (next to this file unless overridden).
+DB_PATH = os.getenv("ATTEMPT_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "attempts.db"))
+
+REQUIRED_COLUMNS = ['Login ID', 'Question ID', 'Answer Status', 'TimeSpent (InSeconds)', 'Question Text', 'Attempt ID']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id            INTEGER PRIMARY KEY,
+    row_hash      TEXT    NOT NULL,
+    workbook_id   TEXT    NOT NULL,
+    activity      TEXT    NOT NULL,
+    login_id      TEXT    NOT NULL,
+    question_id   TEXT    NOT NULL,
+    attempt_id    INTEGER NOT NULL,
+    answer_status TEXT,
+    is_correct    INTEGER NOT NULL,
+    time_spent    REAL,
+    question_text TEXT,
+    source_file   TEXT,
+    imported_at   TEXT    NOT NULL
+);
+-- Rows are identified by their content within one workbook (workbook_id is the
+-- fingerprint of all its rows), so re-importing the same workbook under any file
+-- name or activity is ignored, while rows of a different workbook are never merged.
+DROP INDEX IF EXISTS ux_attempts_row_hash;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_attempts_workbook_row ON attempts (workbook_id, row_hash);
+CREATE INDEX IF NOT EXISTS ix_attempts_student_question_attempt
+    ON attempts (login_id, question_id, attempt_id, activity);
+CREATE INDEX IF NOT EXISTS ix_attempts_question ON attempts (question_id, workbook_id, attempt_id);
+CREATE INDEX IF NOT EXISTS ix_attempts_activity ON attempts (activity);
+"""
+
+
+@contextmanager
+def get_connection(db_path=None):
+    """Opens the store, commits on success and always closes the connection."""
+    conn = sqlite3.connect(db_path or DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")  # readers don't block the upload that is importing
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def init_db(db_path=None):
+    with get_connection(db_path) as conn:
+        conn.executescript(SCHEMA)
+
+
+def _normalize_id(value) -> str:
+    """Excel hands numeric IDs back as floats (12.0); store them as '12'."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _is_blank(value) -> bool:
+    return value is None or value != value or str(value).strip() == ''  # value != value catches NaN
+
+
+def _normalize_row(row):
+    """Returns the stored values of one row, or None if it lacks a usable Login ID, Question ID or Attempt ID."""
+    if any(_is_blank(row.get(col)) for col in ('Login ID', 'Question ID', 'Attempt ID')):
+        return None
+    try:
+        attempt_id = int(float(row['Attempt ID']))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+    time_spent = row.get('TimeSpent (InSeconds)')
+    try:
+        time_spent = float(time_spent)
+        if time_spent != time_spent:  # NaN from empty cells
+            time_spent = None
+    except (TypeError, ValueError):
+        time_spent = None
+
+    question_text = row.get('Question Text')
+    if question_text is not None and question_text == question_text:
+        question_text = str(question_text)
+    else:
+        question_text = None
+
+    status = str(row.get('Answer Status', '')).strip()
+    return (
+        _normalize_id(row['Login ID']),
+        _normalize_id(row['Question ID']),
+        attempt_id,
+        status,
+        int(status == 'Correct'),
+        time_spent,
+        question_text,
+    )
+
+
+def _row_hash(values) -> str:
+    """Content fingerprint of one normalized attempt row."""
+    return hashlib.sha256(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def import_rows(rows, activity, source_file=None, db_path=None):
+    """
+    Stores attempt rows (dicts keyed by the workbook column names).
+    The upload gets a workbook_id (fingerprint of all its valid rows) that
+    history timelines group by. Duplicates are detected from row content within
+    that workbook, not from the file name or activity: re-importing the same
+    workbook is skipped, while a different workbook is always kept apart.
+    Rows without a usable Login ID, Question ID or Attempt ID are skipped.
+    Returns counts of inserted, duplicate and skipped rows.
+    """
+    imported_at = datetime.now(timezone.utc).isoformat()
+    rows = list(rows)
+    normalized = [values for values in map(_normalize_row, rows) if values is not None]
+    hashes = [_row_hash(values) for values in normalized]
+    workbook_id = hashlib.sha256("".join(sorted(hashes)).encode('ascii')).hexdigest()[:16]
+    records = [
+        (row_hash, workbook_id, activity) + values + (source_file, imported_at)
+        for row_hash, values in zip(hashes, normalized)
+    ]
+
+    init_db(db_path)
+    with get_connection(db_path) as conn:
+        before = conn.total_changes
+        conn.executemany(
+            """INSERT OR IGNORE INTO attempts
+               (row_hash, workbook_id, activity, login_id, question_id, attempt_id, answer_status,
+                is_correct, time_spent, question_text, source_file, imported_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            records
+        )
+        inserted = conn.total_changes - before
+
+    return {
+        'activity': activity,
+        'workbook_id': workbook_id,
+        'rows': len(records),
+        'inserted': inserted,
+        'duplicates': len(records) - inserted,
+        'skipped': len(rows) - len(records)
+    }
+
+
+def import_dataframe(df, activity, source_file=None, db_path=None):
+    """Stores the rows of a learning-gaps workbook already loaded with pandas."""
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return import_rows(df[REQUIRED_COLUMNS].to_dict('records'), activity, source_file, db_path)
+
+
+def _accuracy_timeline(rows):
+    """Accuracy per (workbook, attempt), in the order the workbooks were imported."""
+    timeline = {}
+    for row in rows:
+        key = (row['workbook_id'], row['attempt_id'])
+        point = timeline.setdefault(key, {
+            'activity': row['activity'], 'workbook_id': row['workbook_id'], 'attempt_id': row['attempt_id'],
+            'imported_at': row['imported_at'], 'answered': 0, 'correct': 0
+        })
+        point['answered'] += 1
+        point['correct'] += row['is_correct']
+    for point in timeline.values():
+        point['accuracy'] = point['correct'] / point['answered']
+    return sorted(timeline.values(), key=lambda p: (p['imported_at'], p['workbook_id'], p['attempt_id']))
+
+
+def _filters(column, value, question_id=None, activity=None):
+    clauses, params = [f"{column} = ?"], [value]
+    if question_id is not None:
+        clauses.append("question_id = ?")
+        params.append(question_id)
+    if activity is not None:
+        clauses.append("activity = ?")
+        params.append(activity)
+    return " AND ".join(clauses), params
+
+
+def student_history(login_id, question_id=None, activity=None, db_path=None):
+    """Every stored attempt of one student, optionally for a single question or activity."""
+    if question_id is not None:
+        question_id = _normalize_id(question_id)
+    where, params = _filters("login_id", _normalize_id(login_id), question_id, activity)
+    with get_connection(db_path) as conn:
+        rows = [dict(r) for r in conn.execute(
+            f"""SELECT activity, workbook_id, question_id, attempt_id, answer_status, is_correct, time_spent,
+                       question_text, imported_at
+                FROM attempts WHERE {where}
+                ORDER BY imported_at, workbook_id, attempt_id, question_id""",
+            params
+        )]
+
+    return {
+        'login_id': _normalize_id(login_id),
+        'attempts': rows,
+        'timeline': _accuracy_timeline(rows),
+        'overall_accuracy': sum(r['is_correct'] for r in rows) / len(rows) if rows else None
+    }
+
+
+def question_history(question_id, activity=None, db_path=None):
+    """Cohort accuracy and timing for one question across every stored workbook and attempt."""
+    where, params = _filters("question_id", _normalize_id(question_id), activity=activity)
+    with get_connection(db_path) as conn:
+        rows = [dict(r) for r in conn.execute(
+            f"""SELECT MAX(activity) AS activity, workbook_id, attempt_id, MIN(imported_at) AS imported_at,
+                       COUNT(*) AS answered, SUM(is_correct) AS correct,
+                       COUNT(DISTINCT login_id) AS students, AVG(time_spent) AS avg_time_spent,
+                       MAX(question_text) AS question_text
+                FROM attempts WHERE {where}
+                GROUP BY workbook_id, attempt_id
+                ORDER BY MIN(imported_at), workbook_id, attempt_id""",
+            params
+        )]
+
+    for row in rows:
+        row['accuracy'] = row['correct'] / row['answered']
+    return {
+        'question_id': _normalize_id(question_id),
+        'question_text': rows[0]['question_text'] if rows else None,
+        'timeline': rows
+    }
@@ -4,12 +4,12 @@ from collections import defaultdict
 import json
 import os
 
-def analyze_learning_gaps(file_path):
+def analyze_learning_gaps(source):
     """
-    Analyze learning gaps from an Excel file and return structured results
+    Analyze learning gaps and return structured results. source is an Excel file path or an already loaded DataFrame
     """
-    # Load the data from the provided file path
-    df = pd.read_excel(file_path)
+    # Load the data unless it was already loaded
+    df = source if isinstance(source, pd.DataFrame) else pd.read_excel(source)
     results = {}
 
     # ===== COHORT-LEVEL ANALYSIS =====
@@ -106,13 +106,13 @@ def convert_to_json_serializable(data):
     else:
         return data
 
-def analyze_and_export(file_path):
+def analyze_and_export(source):
     """
-    Main function to analyze learning gaps and return JSON-serializable results
+    Main function to analyze learning gaps (from an Excel file path or a DataFrame) and return JSON-serializable results
     """
     try:
         # Run the analysis
-        analysis_results = analyze_learning_gaps(file_path)
+        analysis_results = analyze_learning_gaps(source)
         
         # Convert to JSON serializable format
         json_results = convert_to_json_serializable(analysis_results)
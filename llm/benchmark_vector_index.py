@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain_ollama import OllamaEmbeddings
+from local_index import LocalVectorIndex, DEFAULT_INDEX_DIRECTORY
+
+# --- Configuration ---
+CHROMA_DIRECTORY = "./chroma_all_db"
+LOCAL_INDEX_DIRECTORY = os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIRECTORY)
+EMBEDDING_MODEL = "nomic-embed-text"
+K = 3
+REPEATS = 50
+
+SAMPLE_QUERIES = [
+    "What are the duties of a concierge?",
+    "How should a front office handle guest complaints?",
+    "Explain the check-in procedure at a hotel.",
+    "What is grooming and personal hygiene for hotel staff?",
+    "Types of rooms in a hotel",
+]
+
+
+def _summary(label, timings_ms):
+    timings = np.array(timings_ms)
+    print(f"{label:<28} p50={np.percentile(timings, 50):8.3f} ms  "
+          f"p95={np.percentile(timings, 95):8.3f} ms  mean={timings.mean():8.3f} ms")
+
+
+def run_benchmark(queries=SAMPLE_QUERIES, repeats=REPEATS):
+    """
+    Compares search latency of the Chroma store against the local memory-mapped
+    index. Queries are embedded once up front so only the search is timed.
+    """
+    embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL)
+    query_vectors = embeddings.embed_documents(queries)
+
+    start = time.perf_counter()
+    chroma = Chroma(persist_directory=CHROMA_DIRECTORY, embedding_function=embeddings)
+    chroma_open_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    local = LocalVectorIndex(LOCAL_INDEX_DIRECTORY)
+    local_open_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Open: chroma={chroma_open_ms:.1f} ms, local={local_open_ms:.1f} ms ({len(local)} vectors)")
+
+    chroma_timings, local_timings, batch_timings = [], [], []
+    for _ in range(repeats):
+        for vector in query_vectors:
+            start = time.perf_counter()
+            chroma.similarity_search_by_vector(vector, k=K)
+            chroma_timings.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            local.similarity_search_by_vector(vector, k=K)
+            local_timings.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        local.search(query_vectors, k=K)
+        batch_timings.append((time.perf_counter() - start) * 1000 / len(query_vectors))
+
+    _summary("chroma (per query)", chroma_timings)
+    _summary("local (per query)", local_timings)
+    _summary("local batched (per query)", batch_timings)
+
+    # Report how often both backends return the same slides.
+    overlap = []
+    for vector in query_vectors:
+        chroma_docs = chroma.similarity_search_by_vector(vector, k=K)
+        local_docs = local.similarity_search_by_vector(vector, k=K)
+        chroma_keys = {(d.metadata.get("source"), d.metadata.get("slide")) for d in chroma_docs}
+        local_keys = {(d.metadata.get("source"), d.metadata.get("slide")) for d in local_docs}
+        overlap.append(len(chroma_keys & local_keys) / K)
+    print(f"Top-{K} agreement with chroma: {np.mean(overlap):.0%}")
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    run_benchmark(repeats=int(sys.argv[1]) if len(sys.argv) > 1 else REPEATS)
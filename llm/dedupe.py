@@ -0,0 +1,220 @@
+import re
+import hashlib
+from collections import Counter, defaultdict
+from langchain_core.documents import Document
+
+# --- Configuration ---
+# A line is boilerplate if it appears on at least this many slides...
+BOILERPLATE_MIN_SLIDES = 8
+# ...and either spans this many decks, or fills this share of a single deck (slide codes, per-deck footers).
+BOILERPLATE_MIN_SOURCES = 3
+BOILERPLATE_MIN_DECK_SHARE = 0.5
+# MinHash settings: word shingle size, number of hash functions and LSH bands (rows per band = NUM_HASHES / LSH_BANDS).
+SHINGLE_SIZE = 3
+NUM_HASHES = 128
+LSH_BANDS = 32
+# Estimated Jaccard similarity above which two slides are treated as the same document.
+DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+_OCR_BLOCK = re.compile(r"\[\[OCR Image Text:.*?\]\]", re.DOTALL)
+_SLIDE_CODE = re.compile(r"^[A-Z]+_[A-Z0-9_]*\d[A-Z0-9_]*$")
+
+
+def _is_label(line: str) -> bool:
+    """Section labels such as 'Say:' or '📝 Notes:' give notes their structure and are always kept."""
+    return line.endswith(":")
+
+
+def _is_template_token(line: str) -> bool:
+    """Single-token lines that are template artifacts: placeholders like '‹#›' or slide codes like 'HOS_S24'."""
+    return not re.search(r"\w", line) or bool(_SLIDE_CODE.match(line))
+
+
+def _can_be_boilerplate(unit: str) -> bool:
+    """
+    Labels are never boilerplate, and neither are heading-like lines: one-word
+    lines such as 'Summary' or a bare list number (unless they are template
+    artifacts) and all-caps headings such as 'PRIMARY SECTION'.
+    """
+    if _is_label(unit):
+        return False
+    if len(unit.split()) < 2:
+        return _is_template_token(unit)
+    return not unit.isupper()
+
+
+def _lines(text: str):
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _units(text: str):
+    """
+    Splits slide text into the pieces boilerplate is detected on: whole OCR
+    blocks (which may span lines) and the remaining individual lines.
+    """
+    blocks = [block.strip() for block in _OCR_BLOCK.findall(text)]
+    return blocks + _lines(_OCR_BLOCK.sub("\n", text))
+
+
+def find_boilerplate_lines(documents) -> set:
+    """Finds lines and OCR blocks repeated across the corpus: copyright footers, slide codes, logo OCR, stock trainer cues."""
+    slide_counts = Counter()
+    sources = defaultdict(Counter)
+    deck_sizes = Counter(doc.metadata.get("source") for doc in documents)
+
+    for doc in documents:
+        source = doc.metadata.get("source")
+        for unit in set(_units(doc.page_content)):
+            slide_counts[unit] += 1
+            sources[unit][source] += 1
+
+    boilerplate = set()
+    for unit, count in slide_counts.items():
+        if count < BOILERPLATE_MIN_SLIDES or not _can_be_boilerplate(unit):
+            continue
+        per_deck = sources[unit]
+        deck_share = max(n / deck_sizes[source] for source, n in per_deck.items())
+        if len(per_deck) >= BOILERPLATE_MIN_SOURCES or deck_share >= BOILERPLATE_MIN_DECK_SHARE:
+            boilerplate.add(unit)
+    return boilerplate
+
+
+def strip_boilerplate(text: str, boilerplate: set) -> str:
+    """Removes boilerplate OCR blocks whole, then boilerplate lines."""
+    text = _OCR_BLOCK.sub(lambda m: "" if m.group(0).strip() in boilerplate else m.group(0), text)
+    kept = [line for line in text.splitlines() if line.strip() not in boilerplate]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def _has_content(text: str) -> bool:
+    return any(not _is_label(line) for line in _lines(text))
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _hash_params():
+    """Fixed (a, b) pairs for the universal hash family h(x) = (a*x + b) mod p."""
+    params = []
+    for i in range(NUM_HASHES):
+        digest = hashlib.sha256(f"minhash-{i}".encode()).digest()
+        a = int.from_bytes(digest[:8], "little") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:16], "little") % _MERSENNE_PRIME
+        params.append((a, b))
+    return params
+
+
+_HASH_PARAMS = _hash_params()
+
+
+def minhash_signature(text: str):
+    base = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in _shingles(text)]
+    return [min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in base) for a, b in _HASH_PARAMS]
+
+
+def _similarity(sig_a, sig_b) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_HASHES
+
+
+def find_near_duplicates(texts):
+    """
+    Groups near-identical texts with MinHash + LSH banding. Returns a list of
+    clusters (lists of indices into texts), in corpus order.
+    """
+    signatures = [minhash_signature(text) for text in texts]
+    rows = NUM_HASHES // LSH_BANDS
+
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(LSH_BANDS):
+        buckets = defaultdict(list)
+        for i, sig in enumerate(signatures):
+            buckets[tuple(sig[band * rows:(band + 1) * rows])].append(i)
+        for members in buckets.values():
+            for pos, a in enumerate(members):
+                for b in members[pos + 1:]:
+                    root_a, root_b = find(a), find(b)
+                    if root_a != root_b and _similarity(signatures[a], signatures[b]) >= DUPLICATE_THRESHOLD:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = defaultdict(list)
+    for i in range(len(texts)):
+        clusters[find(i)].append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def _reference(metadata) -> str:
+    return f"{metadata.get('source')} (slide {metadata.get('slide')})"
+
+
+def deduplicate_documents(documents):
+    """
+    Ingestion stage run before embedding: strips corpus-wide boilerplate lines and OCR blocks,
+    drops slides left without content and collapses near-duplicate slides into
+    one document. The kept document is the longest in its group; its metadata
+    gains 'references' (every source/slide it stands for) and 'duplicates'.
+    Returns (documents, report).
+    """
+    boilerplate = find_boilerplate_lines(documents)
+
+    cleaned = []
+    removed_lines = 0
+    for doc in documents:
+        text = strip_boilerplate(doc.page_content, boilerplate)
+        removed_lines += sum(1 for unit in _units(doc.page_content) if unit in boilerplate)
+        if _has_content(text):
+            cleaned.append(Document(page_content=text, metadata=dict(doc.metadata)))
+
+    clusters = find_near_duplicates([doc.page_content for doc in cleaned])
+
+    merged = []
+    for members in clusters:
+        group = [cleaned[i] for i in members]
+        keep = max(group, key=lambda doc: len(doc.page_content))
+        metadata = dict(keep.metadata)
+        if len(group) > 1:
+            # Chroma metadata must be scalar, so references are stored as one string.
+            metadata["references"] = "; ".join(_reference(doc.metadata) for doc in group)
+            metadata["duplicates"] = len(group) - 1
+        merged.append(Document(page_content=keep.page_content, metadata=metadata))
+
+    chars_in = sum(len(doc.page_content) for doc in documents)
+    chars_out = sum(len(doc.page_content) for doc in merged)
+    report = {
+        "slides_in": len(documents),
+        "boilerplate_lines": len(boilerplate),
+        "boilerplate_occurrences_removed": removed_lines,
+        "empty_slides_dropped": len(documents) - len(cleaned),
+        "duplicate_slides_collapsed": len(cleaned) - len(merged),
+        "documents_out": len(merged),
+        "chars_in": chars_in,
+        "chars_out": chars_out,
+    }
+    return merged, report
+
+
+def format_report(report) -> str:
+    saved_docs = 1 - report["documents_out"] / report["slides_in"] if report["slides_in"] else 0
+    saved_chars = 1 - report["chars_out"] / report["chars_in"] if report["chars_in"] else 0
+    return "\n".join([
+        f"   - Boilerplate: {report['boilerplate_lines']} repeated lines/OCR blocks, "
+        f"{report['boilerplate_occurrences_removed']} occurrences removed",
+        f"   - Dropped {report['empty_slides_dropped']} slides with no content left",
+        f"   - Collapsed {report['duplicate_slides_collapsed']} near-duplicate slides",
+        f"   - Documents: {report['slides_in']} -> {report['documents_out']} ({saved_docs:.1%} fewer to embed)",
+        f"   - Text: {report['chars_in']:,} -> {report['chars_out']:,} characters ({saved_chars:.1%} smaller)",
+    ])
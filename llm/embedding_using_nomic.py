@@ -1,7 +1,11 @@
+import os
 import re
+import sys
 from langchain_core.documents import Document
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.vectorstores import Chroma
+from local_index import build_index, DEFAULT_INDEX_DIRECTORY
+from dedupe import deduplicate_documents, format_report
 
 # --- Configuration ---
 # This is the single, combined text file generated by your other script.
@@ -10,6 +14,12 @@ SOURCE_TEXT_FILE = "ALL14TEXT.txt"
 PERSIST_DIRECTORY = "./chroma_all_db"
 # The embedding model to use.
 EMBEDDING_MODEL = "nomic-embed-text"
+# Which store to build: "chroma" or "local" (memory-mapped index used by query.py).
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+# The directory where the local memory-mapped index will be stored.
+LOCAL_INDEX_DIRECTORY = os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIRECTORY)
+# Strip repeated boilerplate lines and collapse near-duplicate slides before embedding.
+DEDUPLICATE = True
 
 def create_vector_db():
     """
@@ -62,10 +72,23 @@ def create_vector_db():
         
     print(f"✅ Created {len(documents)} logical documents from '{SOURCE_TEXT_FILE}'.")
 
-    # --- Step 4: Embed and Store in Chroma DB ---
+    # --- Step 4: Strip boilerplate and collapse near-duplicate slides ---
+    if DEDUPLICATE:
+        documents, report = deduplicate_documents(documents)
+        print("✅ Deduplicated documents:")
+        print(format_report(report))
+
+    # --- Step 5: Embed and Store in the configured backend ---
     print(f"Embedding documents using '{EMBEDDING_MODEL}'...")
     embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL)
 
+    if VECTOR_BACKEND == "local":
+        texts = [doc.page_content for doc in documents]
+        vectors = embeddings.embed_documents(texts)
+        build_index(LOCAL_INDEX_DIRECTORY, texts, [doc.metadata for doc in documents], vectors)
+        print(f"🎉 Local vector index created and stored in '{LOCAL_INDEX_DIRECTORY}'.")
+        return
+
     # Create and persist the vector store from the documents
     vectorstore = Chroma.from_documents(
         documents=documents,
@@ -76,6 +99,24 @@ def create_vector_db():
 
     print(f"🎉 Vector database created and stored in '{PERSIST_DIRECTORY}'.")
 
+def export_chroma_to_local_index():
+    """
+    Copies the vectors already stored in the Chroma database into a local
+    memory-mapped index, so switching backends needs no re-embedding.
+    """
+    vectorstore = Chroma(persist_directory=PERSIST_DIRECTORY)
+    data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+    if not data["ids"]:
+        print(f"❌ Error: No vectors found in '{PERSIST_DIRECTORY}'.")
+        return
+
+    metadatas = [meta or {} for meta in data["metadatas"]]
+    build_index(LOCAL_INDEX_DIRECTORY, data["documents"], metadatas, data["embeddings"])
+    print(f"🎉 Exported {len(data['ids'])} vectors from '{PERSIST_DIRECTORY}' to '{LOCAL_INDEX_DIRECTORY}'.")
+
 # --- Main Execution ---
 if __name__ == "__main__":
-    create_vector_db()
+    if "--export-local" in sys.argv:
+        export_chroma_to_local_index()
+    else:
+        create_vector_db()
@@ -0,0 +1,141 @@
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+# nomic-embed-text produces 768-dimensional vectors, so fake vectors match the stored index.
+EMBEDDING_DIMENSIONS = 768
+
+
+def fake_embedding(text: str, dimensions=EMBEDDING_DIMENSIONS):
+    """Deterministic unit vector derived from the text, so equal texts embed equally."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class _FakeServer:
+    """Runs a ThreadingHTTPServer in a background thread and counts the requests it serves."""
+
+    def __init__(self, handler_class, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self):
+        with self.lock:
+            self.requests += 1
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep load-test output readable
+
+
+class FakeOllamaServer(_FakeServer):
+    """
+    Stand-in for Ollama's embedding API (/api/embed and the older
+    /api/embeddings). Every request sleeps for `latency` seconds.
+    """
+
+    def __init__(self, latency=0.02, **kwargs):
+        self.latency = latency
+        super().__init__(self._Handler, **kwargs)
+
+    class _Handler(_JSONHandler):
+        def do_POST(self):
+            fake = self.server.fake
+            fake.count()
+            data = self._read_json()
+            time.sleep(fake.latency)
+
+            if self.path == "/api/embed":
+                texts = data.get("input", [])
+                if isinstance(texts, str):
+                    texts = [texts]
+                self._send_json({"model": data.get("model"), "embeddings": [fake_embedding(t) for t in texts]})
+            elif self.path == "/api/embeddings":
+                self._send_json({"embedding": fake_embedding(data.get("prompt", ""))})
+            else:
+                self._send_json({"error": f"unknown path {self.path}"}, status=404)
+
+
+class FakeChatServer(_FakeServer):
+    """
+    Stand-in for Groq's OpenAI-compatible chat completions API. A response
+    takes `latency` seconds to first token plus `completion_tokens` generated
+    at `tokens_per_second`. Set `rate_limit_every` to answer every Nth
+    request with HTTP 429.
+    """
+
+    def __init__(self, latency=0.3, tokens_per_second=500, completion_tokens=800, rate_limit_every=0, **kwargs):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.rate_limit_every = rate_limit_every
+        super().__init__(self._Handler, **kwargs)
+
+    class _Handler(_JSONHandler):
+        def do_POST(self):
+            fake = self.server.fake
+            fake.count()
+            data = self._read_json()
+
+            if not self.path.endswith("/chat/completions"):
+                self._send_json({"error": f"unknown path {self.path}"}, status=404)
+                return
+            if fake.rate_limit_every and fake.requests % fake.rate_limit_every == 0:
+                self._send_json({"error": {"message": "Rate limit reached", "type": "tokens"}}, status=429)
+                return
+
+            time.sleep(fake.latency + fake.completion_tokens / fake.tokens_per_second)
+
+            prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in data.get("messages", []))
+            content = "### Key Topics Summary\n" + " ".join(["token"] * fake.completion_tokens)
+            self._send_json({
+                "id": f"chatcmpl-fake-{fake.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": data.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": fake.completion_tokens,
+                    "total_tokens": prompt_tokens + fake.completion_tokens,
+                },
+            })
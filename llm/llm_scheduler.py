@@ -0,0 +1,218 @@
+import re
+import time
+import threading
+
+
+def coalesce_key(query: str) -> str:
+    """Normalizes a query so trivially different requests share one generation."""
+    key = re.sub(r"\s+", " ", query.strip().lower())
+    return key.rstrip("?.! ")
+
+
+class SingleFlight:
+    """
+    Lets concurrent callers with the same key share one in-flight call.
+    The first caller runs the function; everyone else waits for its result
+    (or its exception). Nothing is cached once the call finishes.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+def _status_code(error):
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_rate_limit_error(error) -> bool:
+    return _status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_transient_error(error) -> bool:
+    """Errors the Groq SDK itself would retry: connection problems, timeouts, 408, 409 and 5xx."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+    status = _status_code(error)
+    return isinstance(status, int) and (status in (408, 409) or status >= 500)
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucketScheduler:
+    """
+    Token-bucket limiter for provider calls. Callers queue in arrival order
+    until a token is available instead of failing. A 429 from the provider
+    pauses the bucket and re-queues the call; transient errors are retried
+    with backoff, as the Groq SDK would have done.
+    """
+
+    def __init__(self, requests_per_minute, burst, max_retries=3):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst
+        self.max_retries = max_retries
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rate_limited = 0
+        self.transient_errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def _refill(self, now):
+        # _updated may lie in the future while paused; no tokens accrue until the pause ends.
+        self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._updated) * self.rate)
+        self._updated = max(self._updated, now)
+
+    def acquire(self) -> float:
+        """
+        Blocks until this caller is at the head of the queue and a token is free.
+        Returns the seconds spent waiting.
+        """
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if ticket == self._serving and now >= self._paused_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        self._serving += 1
+                        self._cond.notify_all()
+                        break
+                    if ticket != self._serving:
+                        self._cond.wait()
+                    else:
+                        delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+                        self._cond.wait(max(delay, 0.001))
+            finally:
+                self.waiting -= 1
+
+            waited = time.monotonic() - start
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.last_wait = waited
+            return waited
+
+    def pause(self, seconds):
+        """Stops handing out tokens for a while, e.g. after the provider returned 429."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = max(self._updated, self._paused_until)
+            self._cond.notify_all()
+
+    def run(self, fn, on_wait=None):
+        """
+        Calls fn once a token is available. A rate-limit error pauses the whole
+        bucket; a transient error (connection, 408, 409, 5xx) backs off only this
+        call. Either way the call is re-queued, up to max_retries times.
+        If given, on_wait is called once with the total seconds spent queued
+        across all attempts.
+        """
+        queued = 0.0
+        for attempt in range(self.max_retries + 1):
+            queued += self.acquire()
+            with self._cond:
+                self.running += 1
+            try:
+                result = fn()
+                with self._cond:
+                    self.completed += 1
+                if on_wait:
+                    on_wait(queued)
+                return result
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if attempt == self.max_retries or not (rate_limited or is_transient_error(e)):
+                    if on_wait:
+                        on_wait(queued)
+                    raise
+                delay = _retry_after(e) or 2 ** attempt
+                with self._cond:
+                    if rate_limited:
+                        self.rate_limited += 1
+                    else:
+                        self.transient_errors += 1
+            finally:
+                with self._cond:
+                    self.running -= 1
+
+            if rate_limited:
+                print(f"Provider rate limit hit, retrying in {delay:.1f}s")
+                self.pause(delay)
+            else:
+                print(f"Transient provider error, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            started = self._serving
+            return {
+                "queue_depth": self.waiting,
+                "running": self.running,
+                "completed": self.completed,
+                "rate_limited": self.rate_limited,
+                "transient_errors": self.transient_errors,
+                "available_tokens": round(self._tokens, 2),
+                "avg_wait_seconds": round(self.total_wait / started, 3) if started else 0.0,
+                "max_wait_seconds": round(self.max_wait, 3),
+                "last_wait_seconds": round(self.last_wait, 3),
+            }
@@ -0,0 +1,159 @@
+"""
+Load-test harness for the /query endpoint.
+
+Starts local stand-ins for Ollama and Groq (see fake_llm_servers.py), points
+query.py at them, serves the Flask app from backend/app.py in-process and
+drives /query with concurrent synthetic users. Run it from backend/, like the
+server itself, so relative paths such as ./chroma_all_db resolve the same way:
+
+    cd backend
+    python ../llm/load_test.py --users 1,2,4,8,16 --requests-per-user 10
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from fake_llm_servers import FakeOllamaServer, FakeChatServer
+
+BACKEND_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+SAMPLE_TOPICS = [
+    "duties of a concierge",
+    "handling guest complaints at the front desk",
+    "hotel check-in procedure",
+    "grooming standards for hotel staff",
+    "types of hotel rooms",
+    "telephone etiquette",
+    "housekeeping room cleaning sequence",
+    "food and beverage service styles",
+]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test /query against fake Ollama and Groq servers.")
+    parser.add_argument("--users", default="1,2,4,8,16", help="Comma-separated concurrency levels to run.")
+    parser.add_argument("--requests-per-user", type=int, default=10)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0,
+                        help="Fraction of requests that reuse a shared query (exercises coalescing).")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="Seconds per embedding request.")
+    parser.add_argument("--chat-latency", type=float, default=0.3, help="Seconds to first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--completion-tokens", type=int, default=800)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every Nth chat request with 429.")
+    parser.add_argument("--requests-per-minute", type=float, default=100000,
+                        help="GROQ_REQUESTS_PER_MINUTE for the scheduler under test.")
+    parser.add_argument("--burst", type=int, default=1000, help="GROQ_BURST for the scheduler under test.")
+    return parser.parse_args()
+
+
+def start_app(args, ollama, chat):
+    """Points query.py at the fake servers and serves the Flask app on a free port."""
+    os.environ["OLLAMA_BASE_URL"] = ollama.url
+    os.environ["GROQ_API_BASE"] = chat.url
+    os.environ.setdefault("GROQ_API_KEY", "load-test")
+    os.environ["GROQ_REQUESTS_PER_MINUTE"] = str(args.requests_per_minute)
+    os.environ["GROQ_BURST"] = str(args.burst)
+
+    sys.path.append(BACKEND_DIRECTORY)
+    from werkzeug.serving import make_server
+    import app as backend_app
+
+    server = make_server("127.0.0.1", 0, backend_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, backend_app.query
+
+
+def post_query(url, text):
+    body = json.dumps({"query": text}).encode("utf-8")
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            answer = json.loads(response.read()).get("answer", "")
+            # run_query reports failures inside a 200 response.
+            ok = not answer.startswith("I encountered an error")
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_level(url, users, args):
+    def user(user_id):
+        rng = random.Random(user_id)
+        results = []
+        for i in range(args.requests_per_user):
+            topic = rng.choice(SAMPLE_TOPICS)
+            if rng.random() >= args.duplicate_ratio:
+                topic = f"{topic} (user {user_id}, request {i})"
+            results.append(post_query(url, f"Explain {topic}"))
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        results = [r for batch in executor.map(user, range(users)) for r in batch]
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, ok in results if ok]
+    return {
+        "users": users,
+        "requests": len(results),
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    args = parse_args()
+    ollama = FakeOllamaServer(latency=args.embed_latency).start()
+    chat = FakeChatServer(
+        latency=args.chat_latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        rate_limit_every=args.rate_limit_every,
+    ).start()
+    server, query = start_app(args, ollama, chat)
+    url = f"http://127.0.0.1:{server.server_port}/query"
+    print(f"Fake Ollama: {ollama.url}  Fake Groq: {chat.url}  App: {url}\n")
+
+    try:
+        for users in [int(u) for u in args.users.split(",")]:
+            query.stage_timings.reset()
+            embed_before, chat_before = ollama.requests, chat.requests
+            level = run_level(url, users, args)
+            stats = query.get_llm_stats()
+
+            print(f"=== {users} concurrent users ===")
+            print(f"Requests: {level['requests']}  Errors: {level['errors']}  "
+                  f"Throughput: {level['throughput']:.2f} req/s")
+            print(f"Latency: p50={level['p50'] * 1000:.0f} ms  p95={level['p95'] * 1000:.0f} ms  "
+                  f"p99={level['p99'] * 1000:.0f} ms")
+            for stage, timing in stats["stages"].items():
+                print(f"  {stage:<11} n={timing['count']:<5} p50={timing['p50_ms']:.0f} ms  "
+                      f"p95={timing['p95_ms']:.0f} ms  p99={timing['p99_ms']:.0f} ms")
+            print(f"Upstream calls: embed={ollama.requests - embed_before}  chat={chat.requests - chat_before}  "
+                  f"coalesced total={stats['coalescing']['coalesced']}  "
+                  f"rate limited total={stats['scheduler']['rate_limited']}\n")
+    finally:
+        server.shutdown()
+        ollama.stop()
+        chat.stop()
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+from typing import Any, List
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# --- Configuration ---
+# File names inside the index directory.
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+# Pointer file naming the version subdirectory that holds the live index.
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v-"
+# Default index location. Anchored to this file so llm/ scripts and the backend
+# (which runs from backend/) read the same index; callers let LOCAL_INDEX_DIR override it.
+DEFAULT_INDEX_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_index")
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Returns the vectors as a float32 matrix with unit-length rows."""
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _encode_columns(metadatas):
+    """
+    Turns a list of metadata dicts into a column table. String columns are
+    dictionary-encoded so repeated values (e.g. the deck name) are stored once.
+    """
+    keys = sorted({key for meta in metadatas for key in meta})
+    columns = {}
+    for key in keys:
+        values = [meta.get(key) for meta in metadatas]
+        if all(isinstance(v, str) for v in values):
+            uniques = sorted(set(values))
+            lookup = {v: code for code, v in enumerate(uniques)}
+            columns[key] = {"values": uniques, "codes": [lookup[v] for v in values]}
+        else:
+            columns[key] = {"raw": values}
+    return columns
+
+
+def _decode_column(column):
+    if "raw" in column:
+        return column["raw"]
+    values = column["values"]
+    return [values[code] for code in column["codes"]]
+
+
+def _resolve_version(directory):
+    """Returns the directory holding the live index files: the one CURRENT points to, or directory itself."""
+    pointer = os.path.join(directory, CURRENT_FILE)
+    if not os.path.exists(pointer):
+        return directory
+    with open(pointer, "r", encoding="utf-8") as f:
+        return os.path.join(directory, f.read().strip())
+
+
+def _prune_versions(directory, keep):
+    """Deletes old version subdirectories, keeping the given ones (the live and the previous index)."""
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(VERSION_PREFIX) and name not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def build_index(directory, texts, metadatas, vectors):
+    """
+    Writes a local index: normalized float32 vectors in a .npy file that can be
+    memory-mapped, plus a compact JSON side table holding text and metadata.
+    Both files go into a new version subdirectory and a single CURRENT pointer
+    file is then replaced atomically, so a worker opening the index always sees
+    a matching pair. The previous version is kept for workers still mapping it.
+    """
+    matrix = normalize_rows(vectors)
+    if len(texts) != len(matrix) or len(metadatas) != len(matrix):
+        raise ValueError("texts, metadatas and vectors must have the same length.")
+
+    os.makedirs(directory, exist_ok=True)
+    previous = os.path.basename(_resolve_version(directory))
+    version = f"{VERSION_PREFIX}{time.time_ns()}-{os.getpid()}"
+    version_directory = os.path.join(directory, version)
+    os.makedirs(version_directory)
+
+    with open(os.path.join(version_directory, VECTORS_FILE), "wb") as f:
+        np.save(f, matrix)
+    with open(os.path.join(version_directory, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump({"contents": list(texts), "columns": _encode_columns(metadatas)}, f, ensure_ascii=False)
+
+    pointer = os.path.join(directory, CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+
+    _prune_versions(directory, keep={version, previous})
+    return LocalVectorIndex(directory)
+
+
+class LocalVectorIndex:
+    """
+    Exact cosine-similarity index over a memory-mapped vector matrix.
+    Opening it only maps the file, so workers start instantly and share the
+    vector pages through the OS page cache.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        files = _resolve_version(directory)
+        self.vectors = np.load(os.path.join(files, VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(files, METADATA_FILE), "r", encoding="utf-8") as f:
+            table = json.load(f)
+        self.contents = table["contents"]
+        self.columns = {key: _decode_column(col) for key, col in table["columns"].items()}
+
+        # Vectors and side table must describe the same rows, or document(i) returns the wrong slide.
+        rows = self.vectors.shape[0]
+        lengths = {"contents": len(self.contents), **{key: len(values) for key, values in self.columns.items()}}
+        mismatched = {name: n for name, n in lengths.items() if n != rows}
+        if mismatched:
+            raise ValueError(
+                f"Local index in '{files}' is inconsistent: {rows} vectors but {mismatched}. "
+                "Rebuild it with embedding_using_nomic.py."
+            )
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def metadata(self, i) -> dict:
+        return {key: values[i] for key, values in self.columns.items() if values[i] is not None}
+
+    def document(self, i) -> Document:
+        return Document(page_content=self.contents[i], metadata=self.metadata(i))
+
+    def search(self, query_vectors, k=3):
+        """
+        Exact top-k search for a batch of query vectors.
+        Returns one list of (row, score) pairs per query, best match first.
+        """
+        queries = normalize_rows(query_vectors)
+        if len(self) == 0:
+            return [[] for _ in range(len(queries))]
+        k = min(k, len(self))
+
+        # One matrix product scores every query against every stored vector.
+        scores = queries @ self.vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([(int(i), float(scores[row, i])) for i in ordered])
+        return results
+
+    def similarity_search_by_vector(self, embedding, k=3) -> List[Document]:
+        return [self.document(i) for i, _ in self.search([embedding], k)[0]]
+
+
+class LocalIndexRetriever(BaseRetriever):
+    """LangChain retriever that embeds the query and searches a LocalVectorIndex."""
+
+    index: LocalVectorIndex
+    embeddings: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        query_vector = self.embeddings.embed_query(query)
+        return self.index.similarity_search_by_vector(query_vector, k=self.k)
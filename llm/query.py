@@ -1,27 +1,136 @@
 # 3_query.py
 import os
+import time
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_community.vectorstores import Chroma
 from langchain_ollama import OllamaEmbeddings
-from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from langchain_core.documents import Document
+from langchain_core.callbacks import BaseCallbackHandler
+from local_index import LocalVectorIndex, LocalIndexRetriever, DEFAULT_INDEX_DIRECTORY
+from llm_scheduler import SingleFlight, TokenBucketScheduler, coalesce_key
 
 load_dotenv()
 if not os.getenv("GROQ_API_KEY"):
     raise ValueError("GROQ_API_KEY not found in .env file.")
 
-embeddings = OllamaEmbeddings(model="nomic-embed-text")
+# OLLAMA_BASE_URL and GROQ_API_BASE (read by ChatGroq) let the load-test
+# harness point these clients at local stand-in servers.
+embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url=os.getenv("OLLAMA_BASE_URL"))
 
 llm = ChatGroq(
     model_name="openai/gpt-oss-120b",
-    temperature=0.7
+    temperature=0.7,
+    max_retries=0  # rate-limit and transient-error retries are handled by llm_scheduler below
 )
 
-vectorstore = Chroma(
-    persist_directory="./chroma_all_db",
-    embedding_function=embeddings
+# Every Groq call waits for a token here instead of failing on provider limits,
+# and concurrent identical queries share a single in-flight generation.
+llm_scheduler = TokenBucketScheduler(
+    requests_per_minute=float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+    burst=int(os.getenv("GROQ_BURST", "10")),
+    max_retries=int(os.getenv("GROQ_MAX_RETRIES", "3"))
 )
+llm_flight = SingleFlight()
+
+
+class StageTimings(BaseCallbackHandler):
+    """
+    Records how long each stage of a query takes (queue wait, retrieval,
+    generation). Retrieval and generation are timed from LangChain callbacks.
+    """
+
+    def __init__(self, max_samples=5000):
+        self._lock = threading.Lock()
+        self._starts = {}
+        self._max_samples = max_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self._max_samples))
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def _start(self, run_id):
+        self._starts[run_id] = time.perf_counter()
+
+    def _end(self, stage, run_id):
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            self.record(stage, time.perf_counter() - started)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end("retrieve", run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end("generate", run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+
+    def summary(self) -> dict:
+        """Count and p50/p95/p99 in milliseconds per stage."""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+        result = {}
+        for stage, values in samples.items():
+            if not values:
+                continue
+            pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+            result[stage] = {"count": len(values), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._starts.clear()
+
+
+stage_timings = StageTimings()
+
+
+def record_queue_wait(seconds):
+    """Records the time a request spent queued for the LLM scheduler, once per request."""
+    stage_timings.record("queue_wait", seconds)
+
+# Retrieval backend: "chroma" (default) or "local" for the memory-mapped index
+# written by embedding_using_nomic.py.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+CHROMA_DIRECTORY = "./chroma_all_db"
+LOCAL_INDEX_DIRECTORY = os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIRECTORY)
+RETRIEVAL_K = 3
+# Default number of concurrent LLM calls for /query/batch.
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+# Largest number of queries accepted by one /query/batch request. Every query
+# waits in the shared LLM queue, so a huge batch would stall other users.
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "20"))
+
+if VECTOR_BACKEND == "local":
+    vectorstore = LocalVectorIndex(LOCAL_INDEX_DIRECTORY)
+    retriever = LocalIndexRetriever(index=vectorstore, embeddings=embeddings, k=RETRIEVAL_K)
+elif VECTOR_BACKEND == "chroma":
+    vectorstore = Chroma(
+        persist_directory=CHROMA_DIRECTORY,
+        embedding_function=embeddings
+    )
+    retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": RETRIEVAL_K})
+else:
+    raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}'. Use 'chroma' or 'local'.")
 
 prompt_template = """
 *ROLE:* You are an expert educational content creator who synthesizes information into clear, structured summaries.
@@ -51,14 +160,6 @@ PROMPT = PromptTemplate(
     template=prompt_template, input_variables=["context", "question"]
 )
 
-qa_chain = RetrievalQA.from_chain_type(
-    llm=llm,
-    chain_type="stuff",
-    retriever=vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3}),
-    chain_type_kwargs={"prompt": PROMPT},
-    return_source_documents=True
-)
-
 # Function to handle queries
 def run_query(query: str) -> str:
     try:
@@ -67,17 +168,10 @@ def run_query(query: str) -> str:
         
         print(f"Processing query: {query}")
         
-        # Invoke the QA chain
-        result = qa_chain.invoke({"query": query})
-        
-        # Extract the answer
-        answer = result.get("result", "")
-        
-        if not answer:
-            return "I couldn't generate a response for your query. Please try rephrasing your question or ask about a different topic."
-        
-        # Add some formatting to make the response more readable
-        formatted_answer = format_response(answer)
+        # Retrieve outside the scheduler so embedding and search never hold an LLM token;
+        # only generation is rate limited (and shared with identical in-flight queries)
+        documents = retriever.invoke(query, config={"callbacks": [stage_timings]})
+        formatted_answer = generate_answer(query, documents)
         
         print(f"Query processed successfully. Response generated.")
         return formatted_answer
@@ -87,6 +181,14 @@ def run_query(query: str) -> str:
         print(error_msg)
         return f"I encountered an error while processing your query. Please try again or rephrase your question. Error: {str(e)}"
 
+def get_llm_stats() -> dict:
+    """Queue depth, wait times, coalescing counters and per-stage latencies for the LLM call path."""
+    return {
+        "scheduler": llm_scheduler.stats(),
+        "coalescing": llm_flight.stats(),
+        "stages": stage_timings.summary()
+    }
+
 def format_response(response: str) -> str:
     """Format the response to make it more readable for study materials with proper Markdown formatting"""
     import re
@@ -119,3 +221,117 @@ def format_response(response: str) -> str:
     formatted = re.sub(r'(---)\n', r'\1\n\n', formatted)
     
     return formatted
+
+
+def retrieve_batch(query_vectors, k=RETRIEVAL_K):
+    """
+    Runs one batched similarity search and returns (documents per query,
+    number of distinct slides). Hits are deduplicated by row id before any
+    Document is built, so a slide retrieved by several queries is read and
+    materialized once and the queries share that one object.
+    """
+    cache = {}
+    if VECTOR_BACKEND == "local":
+        results = []
+        for hits in vectorstore.search(query_vectors, k):
+            for i, _ in hits:
+                if i not in cache:
+                    cache[i] = vectorstore.document(i)
+            results.append([cache[i] for i, _ in hits])
+        return results, len(cache)
+
+    result = vectorstore._collection.query(
+        query_embeddings=query_vectors,
+        n_results=k,
+        include=["documents", "metadatas"]
+    )
+    results = []
+    for ids, texts, metas in zip(result["ids"], result["documents"], result["metadatas"]):
+        for doc_id, text, meta in zip(ids, texts, metas):
+            if doc_id not in cache:
+                cache[doc_id] = Document(page_content=text, metadata=meta or {})
+        results.append([cache[doc_id] for doc_id in ids])
+    return results, len(cache)
+
+
+def generate_answer(query: str, documents) -> str:
+    """Generates study material for one query from already retrieved documents."""
+    context = "\n\n".join(doc.page_content for doc in documents)
+
+    def generate():
+        response = llm.invoke(PROMPT.format(context=context, question=query), config={"callbacks": [stage_timings]})
+        return response.content if hasattr(response, "content") else str(response)
+
+    answer = llm_flight.do(coalesce_key(query), lambda: llm_scheduler.run(generate, on_wait=record_queue_wait))
+    if not answer:
+        return "I couldn't generate a response for your query. Please try rephrasing your question or ask about a different topic."
+    return format_response(answer)
+
+
+def run_batch_query(queries, max_concurrency=BATCH_LLM_CONCURRENCY):
+    """
+    Embeds all queries in one call, retrieves with a single batched search and
+    returns a generator that yields one result dict per query as its LLM call
+    completes, followed by a final summary dict.
+    Embedding and retrieval happen before this returns, so their errors surface
+    to the caller instead of in the middle of the stream.
+    """
+    queries = [q.strip() for q in queries]
+    unique_queries = list(dict.fromkeys(q for q in queries if q))
+    print(f"Processing batch of {len(queries)} queries ({len(unique_queries)} unique)")
+
+    retrieved = {}
+    unique_slides = 0
+    if unique_queries:
+        query_vectors = embeddings.embed_documents(unique_queries)
+        documents, unique_slides = retrieve_batch(query_vectors)
+        retrieved = dict(zip(unique_queries, documents))
+
+    total_retrieved = sum(len(docs) for docs in retrieved.values())
+    return _generate_batch(queries, retrieved, max(1, max_concurrency), {
+        "status": "complete",
+        "total": len(queries),
+        "unique_queries": len(unique_queries),
+        "retrieved_slides": total_retrieved,
+        "unique_slides": unique_slides,
+    })
+
+
+def _generate_batch(queries, retrieved, max_concurrency, summary):
+    def sources(documents):
+        result = []
+        for d in documents:
+            source = {"source": d.metadata.get("source"), "slide": d.metadata.get("slide")}
+            # Slides collapsed at ingestion list every source/slide they stand for.
+            if d.metadata.get("references"):
+                source["references"] = d.metadata["references"]
+            result.append(source)
+        return result
+
+    for index, query in enumerate(queries):
+        if not query:
+            yield {"index": index, "query": query, "status": "error", "error": "Query cannot be empty"}
+
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    try:
+        # Identical queries share one generation.
+        futures = {
+            executor.submit(generate_answer, query, documents): query
+            for query, documents in retrieved.items()
+        }
+        for future in as_completed(futures):
+            query = futures[future]
+            try:
+                result = {"status": "success", "answer": future.result()}
+            except Exception as e:
+                print(f"Error processing batch query '{query}': {str(e)}")
+                result = {"status": "error", "error": f"Failed to process query: {str(e)}"}
+            result["sources"] = sources(retrieved[query])
+            for index, q in enumerate(queries):
+                if q == query:
+                    yield {"index": index, "query": query, **result}
+    finally:
+        # If the client goes away mid-stream, drop the calls that have not started.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield summary